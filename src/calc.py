@@ -1,60 +1,59 @@
 """
-Модуль калькулятора с использованием алгоритма Shunting Yard.
+Модуль калькулятора: вычисление разбором Пратта и перевод в RPN алгоритмом Shunting Yard.
 """
 
-import re
-import operator
+from functools import lru_cache
+from typing import Any
+from typing import Final
+from typing import Optional
+from typing import Union
+
 import const as constants
 
-# Глобальный словарь операторов
-OPERATORS = {
-    "**": {
-        "precedence": 4,
-        "associativity": "right",
-        "function": operator.pow,
-    },
-    "*": {
-        "precedence": 3,
-        "associativity": "left",
-        "function": operator.mul,
-    },
-    "/": {
-        "precedence": 3,
-        "associativity": "left",
-        "function": operator.truediv,
-    },
-    "//": {
-        "precedence": 3,
-        "associativity": "left",
-        "function": operator.floordiv,
-    },
-    "%": {
-        "precedence": 3,
-        "associativity": "left",
-        "function": operator.mod,
-    },
-    "+": {
-        "precedence": 2,
-        "associativity": "left",
-        "function": operator.add,
-    },
-    "-": {
-        "precedence": 2,
-        "associativity": "left",
-        "function": operator.sub,
-    },
-    "u+": {
-        "precedence": 5,
-        "associativity": "right",
-        "function": lambda x: x,
-    },
-    "u-": {
-        "precedence": 5,
-        "associativity": "right",
-        "function": lambda x: -x,
-    },
+Number = Union[int, float]
+# Токен: (вид, текст, значение); значение - число, идентификатор оператора или None
+Token = tuple[int, str, Any]
+
+# Виды токенов
+NUMBER: Final = 0
+OPERATOR: Final = 1
+LPAREN: Final = 2
+RPAREN: Final = 3
+
+# Принимаются только ASCII-цифры: "٣" или "²" считаются некорректными символами
+DIGITS: Final = "0123456789"
+WHITESPACE: Final = " \t\n\r"
+
+# Идентификаторы операторов
+POW: Final = 0
+MUL: Final = 1
+DIV: Final = 2
+FLOORDIV: Final = 3
+MOD: Final = 4
+ADD: Final = 5
+SUB: Final = 6
+UPLUS: Final = 7
+UMINUS: Final = 8
+
+# Унарные операторы занимают верхнюю часть диапазона идентификаторов
+UNARY_BASE: Final = UPLUS
+
+OP_ID: Final[dict[str, int]] = {
+    "**": POW,
+    "*": MUL,
+    "/": DIV,
+    "//": FLOORDIV,
+    "%": MOD,
+    "+": ADD,
+    "-": SUB,
+    "u+": UPLUS,
+    "u-": UMINUS,
 }
 
+# Свойства операторов, индексируемые идентификатором оператора
+PREC: Final[tuple[int, ...]] = (4, 3, 3, 3, 3, 2, 2, 5, 5)
+RIGHT_ASSOC: Final[tuple[int, ...]] = (1, 0, 0, 0, 0, 0, 0, 1, 1)
+
 
 class CalculatorError(Exception):
     """Базовый класс для ошибок калькулятора."""
@@ -71,195 +70,256 @@ class InvalidExpressionError(CalculatorError):
     pass
 
 
-def _is_number(token):
-    """
-    Проверяет, является ли токен числом.
-
-    Args:
-        token: Токен для проверки
-
-    Returns:
-        bool: True если токен является числом, иначе False
+def tokenize(expression: str) -> list[Token]:
     """
-    try:
-        float(token)
-        return True
-    except:
-        return False
+    Токенизация выражения за один проход с обработкой унарных операторов.
 
-
-def _process_unary_operators(tokens):
-    """
-    Обрабатывает унарные операторы + и -.
+    Пробелы разделяют токены: "2 * * 3" - это два оператора "*", а не "**",
+    "1 2" - два числа, а не 12.
 
     Args:
-        tokens: Список токенов
+        expression: Строка с математическим выражением
 
     Returns:
-        List[str]: Список токенов с обработанными унарными операторами
-    """
-    processed_tokens = []
-
-    for i, token in enumerate(tokens):
-        if token in ["+", "-"]:
-            is_unary = (
-                i == 0
-                or tokens[i - 1] == "("
-                or (
-                    tokens[i - 1] in OPERATORS
-                    and not tokens[i - 1].startswith("u")
-                )
-            )
+        List[Tuple[int, str, Optional[Union[int, float]]]]: Список токенов
+        (вид, текст, значение); значение - число или идентификатор оператора
 
-            if is_unary:
-                processed_tokens.append(f"u{token}")
+    Raises:
+        InvalidExpressionError: Если выражение содержит некорректные символы,
+            несогласованные скобки или пропущенные операнды
+    """
+    tokens: list[Token] = []
+    prev_kind = -1  # Начало выражения
+    depth = 0
+    # Первая ошибка структуры выражения; сообщается после проверки символов и скобок
+    error: Optional[str] = None
+    i = 0
+    n = len(expression)
+
+    while i < n:
+        char = expression[i]
+
+        if char in WHITESPACE:
+            i += 1
+            while i < n and expression[i] in WHITESPACE:
+                i += 1
+
+        elif char in DIGITS or (char == "." and i + 1 < n and expression[i + 1] in DIGITS):
+            if error is None and (prev_kind == NUMBER or prev_kind == RPAREN):
+                error = constants.ERROR_INVALID_EXPRESSION
+            j = i
+            while j < n and expression[j] in DIGITS:
+                j += 1
+            if j + 1 < n and expression[j] == "." and expression[j + 1] in DIGITS:
+                j += 1
+                while j < n and expression[j] in DIGITS:
+                    j += 1
+                text = expression[i:j]
+                tokens.append((NUMBER, text, float(text)))
             else:
-                processed_tokens.append(token)
-        else:
-            processed_tokens.append(token)
-
-    return processed_tokens
+                text = expression[i:j]
+                tokens.append((NUMBER, text, int(text)))
+            prev_kind = NUMBER
+            i = j
+
+        elif char in "+-":
+            if prev_kind < 0 or prev_kind == LPAREN or prev_kind == OPERATOR:
+                text = f"u{char}"
+            else:
+                text = char
+            tokens.append((OPERATOR, text, OP_ID[text]))
+            prev_kind = OPERATOR
+            i += 1
+
+        elif char in "*/":
+            if error is None and prev_kind != NUMBER and prev_kind != RPAREN:
+                error = constants.ERROR_NOT_ENOUGH_OPERANDS
+            if i + 1 < n and expression[i + 1] == char:
+                text = char * 2
+                i += 2
+            else:
+                text = char
+                i += 1
+            tokens.append((OPERATOR, text, OP_ID[text]))
+            prev_kind = OPERATOR
+
+        elif char == "%":
+            if error is None and prev_kind != NUMBER and prev_kind != RPAREN:
+                error = constants.ERROR_NOT_ENOUGH_OPERANDS
+            tokens.append((OPERATOR, char, MOD))
+            prev_kind = OPERATOR
+            i += 1
+
+        elif char == "(":
+            if error is None and (prev_kind == NUMBER or prev_kind == RPAREN):
+                error = constants.ERROR_INVALID_EXPRESSION
+            depth += 1
+            tokens.append((LPAREN, char, None))
+            prev_kind = LPAREN
+            i += 1
 
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                raise InvalidExpressionError(constants.ERROR_UNBALANCED_PARENTHESES)
+            if error is None and prev_kind != NUMBER and prev_kind != RPAREN:
+                error = constants.ERROR_NOT_ENOUGH_OPERANDS
+            tokens.append((RPAREN, char, None))
+            prev_kind = RPAREN
+            i += 1
 
-def tokenize(expression):
-    """
-    Токенизация выражения.
+        elif char.isspace():
+            i += 1
 
-    Args:
-        expression: Строка с математическим выражением
+        else:
+            raise InvalidExpressionError(
+                constants.ERROR_INVALID_SYMBOL.format(symbol=char)
+            )
 
-    Returns:
-        List[str]: Список токенов
+    if depth != 0:
+        raise InvalidExpressionError(constants.ERROR_UNBALANCED_PARENTHESES)
 
-    Raises:
-        InvalidExpressionError: Если выражение содержит некорректные символы
-    """
-    tokens = re.findall(constants.TOKEN_PATTERN, expression, re.VERBOSE)
-    tokens = [token.strip() for token in tokens if token.strip()]
+    if error is None and prev_kind == OPERATOR:
+        error = constants.ERROR_NOT_ENOUGH_OPERANDS
 
-    for token in tokens:
-        if not (
-            _is_number(token)
-            or token in OPERATORS
-            or token in "()"
-            or token in ["**", "//"]
-            or token.startswith("u")
-        ):
-            raise InvalidExpressionError(
-                constants.ERROR_INVALID_SYMBOL.format(symbol=token)
-            )
+    if error is not None:
+        raise InvalidExpressionError(error)
 
-    return _process_unary_operators(tokens)
+    return tokens
 
 
-def _should_pop_operator(stack_top, current_token):
+def _should_pop_operator(stack_top_id: int, current_id: int) -> bool:
     """
     Определяет, нужно ли выталкивать оператор из стека.
 
     Args:
-        stack_top: Верхний элемент стека
-        current_token: Текущий токен-оператор
+        stack_top_id: Идентификатор оператора на вершине стека
+        current_id: Идентификатор текущего оператора
 
     Returns:
         bool: True если нужно вытолкнуть, иначе False
     """
-    if stack_top not in OPERATORS:
-        return False
-
-    stack_op = OPERATORS[stack_top]
-    current_op = OPERATORS[current_token]
-
-    if stack_op["precedence"] > current_op["precedence"]:
-        return True
-
-    if (
-        stack_op["precedence"] == current_op["precedence"]
-        and current_op["associativity"] == "left"
-    ):
-        return True
-
-    return False
+    stack_prec = PREC[stack_top_id]
+    current_prec = PREC[current_id]
+    return stack_prec > current_prec or (stack_prec == current_prec and not RIGHT_ASSOC[current_id])
 
 
-def to_rpn(tokens):
+def to_rpn(tokens: list[Token]) -> list[Token]:
     """
     Преобразует инфиксное выражение в обратную польскую запись (RPN).
 
     Args:
-        tokens: Список токенов в инфиксной записи
+        tokens: Список токенов (вид, текст, значение) в инфиксной записи
 
     Returns:
-        List[str]: Список токенов в RPN
+        List[Tuple[int, str, Optional[Union[int, float]]]]: Список токенов в RPN
 
     Raises:
         InvalidExpressionError: Если скобки несогласованы
     """
-    output = []
-    operator_stack = []
+    size = len(tokens)
+    output: list[Any] = [None] * size
+    output_top = 0
+    operator_stack: list[Any] = [None] * size
+    stack_top = 0
 
     for token in tokens:
-        if _is_number(token):
-            output.append(token)
+        kind, _, value = token
 
-        elif token in OPERATORS:
+        if kind == NUMBER:
+            output[output_top] = token
+            output_top += 1
+
+        elif kind == OPERATOR:
             while (
-                operator_stack
-                and operator_stack[-1] != "("
-                and _should_pop_operator(operator_stack[-1], token)
+                stack_top
+                and operator_stack[stack_top - 1][0] == OPERATOR
+                and _should_pop_operator(operator_stack[stack_top - 1][2], value)
             ):
-                output.append(operator_stack.pop())
+                stack_top -= 1
+                output[output_top] = operator_stack[stack_top]
+                output_top += 1
 
-            operator_stack.append(token)
+            operator_stack[stack_top] = token
+            stack_top += 1
 
-        elif token == "(":
-            operator_stack.append(token)
+        elif kind == LPAREN:
+            operator_stack[stack_top] = token
+            stack_top += 1
 
-        elif token == ")":
-            while operator_stack and operator_stack[-1] != "(":
-                output.append(operator_stack.pop())
+        elif kind == RPAREN:
+            while stack_top and operator_stack[stack_top - 1][0] != LPAREN:
+                stack_top -= 1
+                output[output_top] = operator_stack[stack_top]
+                output_top += 1
 
-            if not operator_stack:
+            if not stack_top:
                 raise InvalidExpressionError(constants.ERROR_UNBALANCED_PARENTHESES)
 
-            operator_stack.pop()  # Удаляем '('
+            stack_top -= 1  # Удаляем '('
 
-    while operator_stack:
-        if operator_stack[-1] == "(":
+    while stack_top:
+        stack_top -= 1
+        if operator_stack[stack_top][0] == LPAREN:
             raise InvalidExpressionError(constants.ERROR_UNBALANCED_PARENTHESES)
-        output.append(operator_stack.pop())
+        output[output_top] = operator_stack[stack_top]
+        output_top += 1
 
-    return output
+    return output[:output_top]
 
 
-def _validate_operation(operator, left, right):
+def _apply_binary(op_id: int, text: str, left: Number, right: Number) -> Number:
     """
-    Проверяет корректность операции.
+    Применяет бинарный оператор к операндам.
+
+    Единственное место с проверками деления на ноль и целочисленности
+    для // и %, общее для evaluate_rpn и разбора Пратта.
 
     Args:
-        operator: Оператор
+        op_id: Идентификатор оператора
+        text: Текст оператора для сообщений об ошибках
         left: Левый операнд
         right: Правый операнд
 
+    Returns:
+        Union[int, float]: Результат операции
+
     Raises:
         DivisionByZeroError: При делении на ноль
-        InvalidExpressionError: При некорректной операции для типов
+        InvalidExpressionError: При операторе // или % с дробным операндом
     """
-    if operator in ["/", "//", "%"] and right == 0:
-        raise DivisionByZeroError(constants.ERROR_DIVISION_BY_ZERO)
+    if DIV <= op_id <= MOD:
+        if right == 0:
+            raise DivisionByZeroError(constants.ERROR_DIVISION_BY_ZERO)
 
-    if operator in ["//", "%"]:
-        if not isinstance(left, int) or not isinstance(right, int):
+        # type() вместо isinstance(): точное сравнение типа дешевле обхода MRO
+        if op_id != DIV and (type(left) is not int or type(right) is not int):  # noqa: E721
             raise InvalidExpressionError(
-                constants.ERROR_INTEGER_OPERATION.format(operator=operator)
+                constants.ERROR_INTEGER_OPERATION.format(operator=text)
             )
 
-
-def evaluate_rpn(rpn_tokens):
+    # Самые частые операторы проверяются первыми
+    if op_id == ADD:
+        return left + right
+    if op_id == SUB:
+        return left - right
+    if op_id == MUL:
+        return left * right
+    if op_id == DIV:
+        return left / right
+    if op_id == POW:
+        return left**right
+    if op_id == FLOORDIV:
+        return left // right
+    return left % right
+
+
+def evaluate_rpn(rpn_tokens: list[Token]) -> Number:
     """
     Вычисляет значение выражения в RPN.
 
     Args:
-        rpn_tokens: Список токенов в RPN
+        rpn_tokens: Список токенов (вид, текст, значение) в RPN
 
     Returns:
         Union[int, float]: Результат вычисления
@@ -268,66 +328,115 @@ def evaluate_rpn(rpn_tokens):
         InvalidExpressionError: Если выражение некорректно
         DivisionByZeroError: При делении на ноль
     """
-    stack = []
+    stack: list[Any] = [None] * len(rpn_tokens)
+    top = 0
 
-    for token in rpn_tokens:
-        if _is_number(token):
-            if "." in token:
-                stack.append(float(token))
-            else:
-                stack.append(int(token))
+    for kind, token, value in rpn_tokens:
+        if kind == NUMBER:
+            stack[top] = value
+            top += 1
 
-        elif token in OPERATORS:
-            if token.startswith("u"):
-                if len(stack) < 1:
+        elif kind == OPERATOR:
+            if value >= UNARY_BASE:
+                if top < 1:
                     raise InvalidExpressionError(constants.ERROR_NOT_ENOUGH_OPERANDS)
 
-                operand = stack.pop()
-                result = OPERATORS[token]["function"](operand)
-                stack.append(result)
+                if value == UMINUS:
+                    stack[top - 1] = -stack[top - 1]
 
             else:
-                if len(stack) < 2:
+                if top < 2:
                     raise InvalidExpressionError(constants.ERROR_NOT_ENOUGH_OPERANDS)
 
-                right = stack.pop()
-                left = stack.pop()
-
-                _validate_operation(token, left, right)
-
-                result = OPERATORS[token]["function"](left, right)
-                stack.append(result)
+                top -= 1
+                stack[top - 1] = _apply_binary(value, token, stack[top - 1], stack[top])
 
-    if len(stack) != 1:
+    if top != 1:
         raise InvalidExpressionError(constants.ERROR_INVALID_EXPRESSION)
 
     return stack[0]
 
 
-def _check_parentheses(expression):
+def _parse_expr(tokens: list[Token]) -> Number:
     """
-    Проверяет сбалансированность скобок.
+    Вычисляет выражение методом Пратта без рекурсии.
+
+    Скобки и правые операнды разбираются через явный стек отложенных
+    операций, цепочка унарных знаков - циклом, поэтому глубина вложенности
+    не ограничена стеком вызовов Python. Структура токенов должна быть
+    проверена функцией tokenize.
 
     Args:
-        expression: Выражение для проверки
+        tokens: Непустой список токенов (вид, текст, значение)
 
     Returns:
-        bool: True если скобки сбалансированы, иначе False
-    """
-    stack = []
-    for char in expression:
-        if char == "(":
-            stack.append(char)
-        elif char == ")":
-            if not stack:
-                return False
-            stack.pop()
-    return len(stack) == 0
-
+        Union[int, float]: Результат вычисления
 
-def calculate(expression):
+    Raises:
+        InvalidExpressionError: При операторе // или % с дробным операндом
+        DivisionByZeroError: При делении на ноль
     """
-    Основная функция вычисления выражения.
+    # Элементы стека: (левый операнд, бинарный оператор, min_prec)
+    # или (флаг отрицания, токен "(", min_prec)
+    pending: list[tuple[Any, Token, int]] = []
+    min_prec: int = 0
+    i: int = 0
+    n: int = len(tokens)
+    op_id: int
+    prec: int
+    value: Number
+
+    while True:
+        # Префикс: цепочка унарных знаков, затем число или "("
+        negate = False
+        token = tokens[i]
+        while token[0] == OPERATOR:
+            op_id = token[2]
+            if op_id == UMINUS:
+                negate = not negate
+            i += 1
+            token = tokens[i]
+        i += 1
+
+        if token[0] == LPAREN:
+            pending.append((negate, token, min_prec))
+            min_prec = 0
+            continue
+
+        value = -token[2] if negate else token[2]
+
+        # Инфикс: бинарные операторы и закрывающие скобки
+        while True:
+            if i < n and tokens[i][0] == OPERATOR:
+                op_id = tokens[i][2]
+                prec = PREC[op_id]
+                if prec >= min_prec:
+                    pending.append((value, tokens[i], min_prec))
+                    min_prec = prec if RIGHT_ASSOC[op_id] else prec + 1
+                    i += 1
+                    break
+
+            if not pending:
+                return value
+
+            left, token, min_prec = pending.pop()
+
+            if token[0] == LPAREN:
+                i += 1  # Пропускаем ')'
+                if left:
+                    value = -value
+                continue
+
+            value = _apply_binary(token[2], token[1], left, value)
+
+
+@lru_cache(maxsize=constants.CACHE_SIZE)
+def _evaluate(expression: str) -> Number:
+    """
+    Вычисляет выражение разбором Пратта.
+
+    Выражение сначала целиком токенизируется, поэтому ошибки синтаксиса
+    сообщаются до начала вычислений. Результаты кэшируются, ошибки не кэшируются.
 
     Args:
         expression: Строка с математическим выражением
@@ -338,35 +447,49 @@ def calculate(expression):
     Raises:
         CalculatorError: При ошибках вычисления
     """
-    try:
-        expression = expression.replace(" ", "")
+    tokens = tokenize(expression)
 
-        if not expression:
-            raise InvalidExpressionError(constants.ERROR_EMPTY_EXPRESSION)
+    size = len(tokens)
 
-        if not _check_parentheses(expression):
-            raise InvalidExpressionError(constants.ERROR_UNBALANCED_PARENTHESES)
+    if not size:
+        raise InvalidExpressionError(constants.ERROR_EMPTY_EXPRESSION)
 
-        tokens = tokenize(expression)
-        rpn_tokens = to_rpn(tokens)
-        result = evaluate_rpn(rpn_tokens)
+    # Быстрые пути: число, число с унарным знаком, "число оператор число".
+    # Структура выражения уже проверена в tokenize.
+    if size == 1:
+        return tokens[0][2]
 
-        return result
+    if size == 2:
+        value = tokens[1][2]
+        return -value if tokens[0][2] == UMINUS else value
 
-    except CalculatorError:
-        raise
-    except Exception as e:
-        raise CalculatorError(constants.ERROR_UNKNOWN.format(error=e))
+    if size == 3 and tokens[0][0] == NUMBER and tokens[2][0] == NUMBER:
+        return _apply_binary(tokens[1][2], tokens[1][1], tokens[0][2], tokens[2][2])
 
+    return _parse_expr(tokens)
 
-def calculate_expression(expression):
+
+def calculate(expression: str) -> Number:
     """
-    Упрощенная функция для вычисления выражения.
+    Основная функция вычисления выражения.
 
     Args:
         expression: Строка с математическим выражением
 
     Returns:
         Union[int, float]: Результат вычисления
+
+    Raises:
+        CalculatorError: При ошибках вычисления
     """
-    return calculate(expression)
\ No newline at end of file
+    try:
+        return _evaluate(expression.strip())
+
+    except CalculatorError:
+        raise
+    except Exception as e:
+        raise CalculatorError(constants.ERROR_UNKNOWN.format(error=e))
+
+
+# Упрощенное имя для вычисления выражения
+calculate_expression = calculate
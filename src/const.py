@@ -2,14 +2,6 @@
 Константы для калькулятора.
 """
 
-# Регулярное выражение для токенизации
-TOKEN_PATTERN = r"""
-    \d+\.\d+|\.\d+|\d+     # числа: 123, 123.45, .45
-    |\*\*|//|[+\-*/%]       # операторы: **, //, +, -, *, /, %
-    |[()]                   # скобки
-    |\S+                    # любой некорректный символ
-"""
-
 # Сообщения об ошибках
 ERROR_EMPTY_EXPRESSION = "Пустое выражение"
 ERROR_UNBALANCED_PARENTHESES = "Несогласованные скобки"
@@ -20,6 +12,9 @@ ERROR_INVALID_EXPRESSION = "Некорректное выражение"
 ERROR_INTEGER_OPERATION = "Оператор '{operator}' работает только с целыми числами"
 ERROR_UNKNOWN = "Неизвестная ошибка: {error}"
 
+# Размер кэша результатов вычислений
+CACHE_SIZE = 256
+
 # Команды выхода
 EXIT_COMMANDS = ('exit', 'quit', 'выход')
 
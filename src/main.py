@@ -6,7 +6,7 @@ import const as constants
 import calc
 
 
-def main():
+def main() -> None:
     """
     Основная функция для запуска калькулятора в интерактивном режиме.
     """
@@ -9,52 +9,96 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
 import pytest
+import calc
 from calc import (
     calculate,
     tokenize,
     to_rpn,
     evaluate_rpn,
+    _evaluate,
+    NUMBER,
+    OPERATOR,
+    LPAREN,
+    RPAREN,
+    OP_ID,
+    ADD,
+    UMINUS,
     InvalidExpressionError,
     DivisionByZeroError,
     CalculatorError,
 )
 
 
+def _texts(tokens):
+    """Возвращает тексты токенов."""
+    return [token[1] for token in tokens]
+
+
+def _tokens(*texts):
+    """Строит список токенов из их текстов."""
+    tokens = []
+    for text in texts:
+        if text == "(":
+            tokens.append((LPAREN, text, None))
+        elif text == ")":
+            tokens.append((RPAREN, text, None))
+        elif text[0].isdigit():
+            tokens.append((NUMBER, text, float(text) if "." in text else int(text)))
+        else:
+            tokens.append((OPERATOR, text, OP_ID[text]))
+    return tokens
+
+
 class TestTokenize:
     """Тесты для функции tokenize."""
 
     def test_basic_tokens(self):
         """Тест базовых токенов."""
-        assert tokenize("2 + 2") == ["2", "+", "2"]
-        assert tokenize("3 * 4 - 5") == ["3", "*", "4", "-", "5"]
-        assert tokenize("10 / 2") == ["10", "/", "2"]
+        assert _texts(tokenize("2 + 2")) == ["2", "+", "2"]
+        assert _texts(tokenize("3 * 4 - 5")) == ["3", "*", "4", "-", "5"]
+        assert _texts(tokenize("10 / 2")) == ["10", "/", "2"]
 
     def test_numbers(self):
         """Тест различных форматов чисел."""
-        assert tokenize("123") == ["123"]
-        assert tokenize("12.34") == ["12.34"]
-        assert tokenize("0.5") == ["0.5"]
-        assert tokenize("-5.5") == ["u-", "5.5"]
+        assert _texts(tokenize("123")) == ["123"]
+        assert _texts(tokenize("12.34")) == ["12.34"]
+        assert _texts(tokenize("0.5")) == ["0.5"]
+        assert _texts(tokenize("-5.5")) == ["u-", "5.5"]
 
     def test_unary_operators(self):
         """Тест унарных операторов."""
-        assert tokenize("-5") == ["u-", "5"]
-        assert tokenize("+3") == ["u+", "3"]
-        assert tokenize("2 + -3") == ["2", "+", "u-", "3"]
-        assert tokenize("2 - +3") == ["2", "-", "u+", "3"]
-        assert tokenize("(-2)") == ["(", "u-", "2", ")"]
-        assert tokenize("-(2 + 3)") == ["u-", "(", "2", "+", "3", ")"]
+        assert _texts(tokenize("-5")) == ["u-", "5"]
+        assert _texts(tokenize("+3")) == ["u+", "3"]
+        assert _texts(tokenize("2 + -3")) == ["2", "+", "u-", "3"]
+        assert _texts(tokenize("2 - +3")) == ["2", "-", "u+", "3"]
+        assert _texts(tokenize("(-2)")) == ["(", "u-", "2", ")"]
+        assert _texts(tokenize("-(2 + 3)")) == ["u-", "(", "2", "+", "3", ")"]
 
     def test_complex_operators(self):
         """Тест сложных операторов."""
-        assert tokenize("2 ** 3") == ["2", "**", "3"]
-        assert tokenize("10 // 3") == ["10", "//", "3"]
-        assert tokenize("10 % 3") == ["10", "%", "3"]
+        assert _texts(tokenize("2 ** 3")) == ["2", "**", "3"]
+        assert _texts(tokenize("10 // 3")) == ["10", "//", "3"]
+        assert _texts(tokenize("10 % 3")) == ["10", "%", "3"]
 
     def test_parentheses(self):
         """Тест скобок."""
-        assert tokenize("(2 + 3)") == ["(", "2", "+", "3", ")"]
-        assert tokenize("((2 + 3) * 4)") == ["(", "(", "2", "+", "3", ")", "*", "4", ")"]
+        assert _texts(tokenize("(2 + 3)")) == ["(", "2", "+", "3", ")"]
+        assert _texts(tokenize("((2 + 3) * 4)")) == ["(", "(", "2", "+", "3", ")", "*", "4", ")"]
+
+    def test_token_kinds(self):
+        """Тест видов токенов."""
+        assert tokenize("-(1)") == [
+            (OPERATOR, "u-", UMINUS),
+            (LPAREN, "(", None),
+            (NUMBER, "1", 1),
+            (RPAREN, ")", None),
+        ]
+
+    def test_number_values(self):
+        """Тест предварительного разбора чисел."""
+        assert tokenize("12 + .5") == [(NUMBER, "12", 12), (OPERATOR, "+", ADD), (NUMBER, ".5", 0.5)]
+        assert not isinstance(tokenize("7")[0][2], float)
+        assert isinstance(tokenize("7.0")[0][2], float)
 
     def test_invalid_symbols(self):
         """Тест некорректных символов."""
@@ -64,6 +108,19 @@ class TestTokenize:
             tokenize("abc + 3")
         with pytest.raises(InvalidExpressionError):
             tokenize("2 $ 3")
+        with pytest.raises(InvalidExpressionError):
+            tokenize("٣ + 1")
+        with pytest.raises(InvalidExpressionError):
+            tokenize("2²")
+
+    def test_unbalanced_parentheses(self):
+        """Тест несогласованных скобок."""
+        with pytest.raises(InvalidExpressionError):
+            tokenize("(2 + 3")
+        with pytest.raises(InvalidExpressionError):
+            tokenize("2 + 3)")
+        with pytest.raises(InvalidExpressionError):
+            tokenize(")2 + 3(")
 
 
 class TestToRPN:
@@ -71,29 +128,29 @@ class TestToRPN:
 
     def test_basic_expressions(self):
         """Тест базовых выражений."""
-        assert to_rpn(["2", "+", "2"]) == ["2", "2", "+"]
-        assert to_rpn(["3", "*", "4"]) == ["3", "4", "*"]
-        assert to_rpn(["2", "+", "3", "*", "4"]) == ["2", "3", "4", "*", "+"]
-        assert to_rpn(["(", "2", "+", "3", ")", "*", "4"]) == ["2", "3", "+", "4", "*"]
+        assert _texts(to_rpn(tokenize("2 + 2"))) == ["2", "2", "+"]
+        assert _texts(to_rpn(tokenize("3 * 4"))) == ["3", "4", "*"]
+        assert _texts(to_rpn(tokenize("2 + 3 * 4"))) == ["2", "3", "4", "*", "+"]
+        assert _texts(to_rpn(tokenize("(2 + 3) * 4"))) == ["2", "3", "+", "4", "*"]
 
     def test_operator_precedence(self):
         """Тест приоритета операторов."""
-        assert to_rpn(["2", "+", "3", "*", "4"]) == ["2", "3", "4", "*", "+"]
-        assert to_rpn(["2", "*", "3", "+", "4"]) == ["2", "3", "*", "4", "+"]
-        assert to_rpn(["2", "**", "3", "**", "2"]) == ["2", "3", "2", "**", "**"]
+        assert _texts(to_rpn(tokenize("2 + 3 * 4"))) == ["2", "3", "4", "*", "+"]
+        assert _texts(to_rpn(tokenize("2 * 3 + 4"))) == ["2", "3", "*", "4", "+"]
+        assert _texts(to_rpn(tokenize("2 ** 3 ** 2"))) == ["2", "3", "2", "**", "**"]
 
     def test_unary_operators_rpn(self):
         """Тест унарных операторов в RPN."""
-        assert to_rpn(["u-", "5"]) == ["5", "u-"]
-        assert to_rpn(["u+", "3"]) == ["3", "u+"]
-        assert to_rpn(["2", "+", "u-", "3"]) == ["2", "3", "u-", "+"]
+        assert _texts(to_rpn(tokenize("-5"))) == ["5", "u-"]
+        assert _texts(to_rpn(tokenize("+3"))) == ["3", "u+"]
+        assert _texts(to_rpn(tokenize("2 + -3"))) == ["2", "3", "u-", "+"]
 
     def test_parentheses_errors(self):
         """Тест ошибок скобок."""
         with pytest.raises(InvalidExpressionError):
-            to_rpn(["(", "2", "+", "3"])
+            to_rpn(_tokens("(", "2", "+", "3"))
         with pytest.raises(InvalidExpressionError):
-            to_rpn(["2", "+", "3", ")"])
+            to_rpn(_tokens("2", "+", "3", ")"))
 
 
 class TestEvaluateRPN:
@@ -101,54 +158,54 @@ class TestEvaluateRPN:
 
     def test_basic_operations(self):
         """Тест базовых операций."""
-        assert evaluate_rpn(["2", "2", "+"]) == 4
-        assert evaluate_rpn(["5", "3", "-"]) == 2
-        assert evaluate_rpn(["4", "2", "*"]) == 8
-        assert evaluate_rpn(["10", "2", "/"]) == 5.0
+        assert evaluate_rpn(_tokens("2", "2", "+")) == 4
+        assert evaluate_rpn(_tokens("5", "3", "-")) == 2
+        assert evaluate_rpn(_tokens("4", "2", "*")) == 8
+        assert evaluate_rpn(_tokens("10", "2", "/")) == 5.0
 
     def test_complex_operations(self):
         """Тест сложных операций."""
-        assert evaluate_rpn(["2", "3", "**"]) == 8
-        assert evaluate_rpn(["10", "3", "//"]) == 3
-        assert evaluate_rpn(["10", "3", "%"]) == 1
+        assert evaluate_rpn(_tokens("2", "3", "**")) == 8
+        assert evaluate_rpn(_tokens("10", "3", "//")) == 3
+        assert evaluate_rpn(_tokens("10", "3", "%")) == 1
 
     def test_unary_operations(self):
         """Тест унарных операций."""
-        assert evaluate_rpn(["5", "u-"]) == -5
-        assert evaluate_rpn(["3", "u+"]) == 3
-        assert evaluate_rpn(["2", "3", "u-", "+"]) == -1
+        assert evaluate_rpn(_tokens("5", "u-")) == -5
+        assert evaluate_rpn(_tokens("3", "u+")) == 3
+        assert evaluate_rpn(_tokens("2", "3", "u-", "+")) == -1
 
     def test_float_operations(self):
         """Тест операций с дробными числами."""
-        assert evaluate_rpn(["2.5", "2", "*"]) == 5.0
-        assert evaluate_rpn(["5.5", "2.5", "+"]) == 8.0
-        assert evaluate_rpn(["10.0", "4.0", "/"]) == 2.5
+        assert evaluate_rpn(_tokens("2.5", "2", "*")) == 5.0
+        assert evaluate_rpn(_tokens("5.5", "2.5", "+")) == 8.0
+        assert evaluate_rpn(_tokens("10.0", "4.0", "/")) == 2.5
 
     def test_division_by_zero(self):
         """Тест деления на ноль."""
         with pytest.raises(DivisionByZeroError):
-            evaluate_rpn(["5", "0", "/"])
+            evaluate_rpn(_tokens("5", "0", "/"))
         with pytest.raises(DivisionByZeroError):
-            evaluate_rpn(["10", "0", "//"])
+            evaluate_rpn(_tokens("10", "0", "//"))
         with pytest.raises(DivisionByZeroError):
-            evaluate_rpn(["5", "0", "%"])
+            evaluate_rpn(_tokens("5", "0", "%"))
 
     def test_integer_operations(self):
         """Тест операций только для целых чисел."""
-        assert evaluate_rpn(["10", "3", "//"]) == 3
-        assert evaluate_rpn(["10", "3", "%"]) == 1
+        assert evaluate_rpn(_tokens("10", "3", "//")) == 3
+        assert evaluate_rpn(_tokens("10", "3", "%")) == 1
         
         with pytest.raises(InvalidExpressionError):
-            evaluate_rpn(["10.5", "3", "//"])
+            evaluate_rpn(_tokens("10.5", "3", "//"))
         with pytest.raises(InvalidExpressionError):
-            evaluate_rpn(["10", "3.5", "%"])
+            evaluate_rpn(_tokens("10", "3.5", "%"))
 
     def test_not_enough_operands(self):
         """Тест недостатка операндов."""
         with pytest.raises(InvalidExpressionError):
-            evaluate_rpn(["2", "+"])
+            evaluate_rpn(_tokens("2", "+"))
         with pytest.raises(InvalidExpressionError):
-            evaluate_rpn(["+"])
+            evaluate_rpn(_tokens("+"))
 
 
 class TestCalculate:
@@ -172,8 +229,21 @@ class TestCalculate:
         """Тест выражений с пробелами."""
         assert calculate("  2 + 2  ") == 4
         assert calculate("2+2") == 4
+        assert calculate("2\t+\t2") == 4
         assert calculate(" ( 2 + 3 ) * 4 ") == 20
 
+    def test_spaces_separate_tokens(self):
+        """Тест разделения токенов пробелами."""
+        # Два оператора подряд, а не "**" или "//"
+        with pytest.raises(InvalidExpressionError, match="Недостаточно операндов"):
+            calculate("2 * * 3")
+        with pytest.raises(InvalidExpressionError, match="Недостаточно операндов"):
+            calculate("2 / / 3")
+        with pytest.raises(InvalidExpressionError):
+            calculate("1 2")
+        with pytest.raises(InvalidExpressionError):
+            calculate("(1 2)")
+
     def test_unary_operators_calculation(self):
         """Тест вычислений с унарными операторами."""
         assert calculate("-5") == -5
@@ -188,10 +258,34 @@ class TestCalculate:
         assert calculate("0.1 + 0.2") == pytest.approx(0.3)
         assert calculate("10.0 / 4.0") == 2.5
 
+    def test_trivial_expressions(self):
+        """Тест быстрых путей для простых выражений."""
+        assert calculate("42") == 42
+        assert not isinstance(calculate("42"), float)
+        assert calculate("42.5") == 42.5
+        assert calculate("-42.5") == -42.5
+        assert calculate("+7") == 7
+        assert calculate("(7)") == 7
+        assert calculate("--7") == 7
+        assert calculate("7 // 2") == 3
+        assert calculate("7 ** 2") == 49
+        with pytest.raises(InvalidExpressionError):
+            calculate("7.5 // 2")
+        with pytest.raises(DivisionByZeroError):
+            calculate("1 % 0")
+        with pytest.raises(InvalidExpressionError):
+            calculate("+")
+        with pytest.raises(InvalidExpressionError):
+            calculate("1 +")
+
     def test_error_cases(self):
         """Тест случаев с ошибками."""
         with pytest.raises(InvalidExpressionError):
             calculate("")
+        with pytest.raises(InvalidExpressionError):
+            calculate("   ")
+        with pytest.raises(InvalidExpressionError):
+            calculate("1 2")
         with pytest.raises(InvalidExpressionError):
             calculate("2 + ")
         with pytest.raises(InvalidExpressionError):
@@ -203,6 +297,54 @@ class TestCalculate:
         with pytest.raises(InvalidExpressionError):
             calculate("2 @ 3")
 
+    def test_cached_results(self):
+        """Тест кэширования результатов."""
+        _evaluate.cache_clear()
+        assert calculate("2 + 2") == 4
+        assert calculate("  2 + 2 ") == 4
+        assert _evaluate.cache_info().hits == 1
+
+        for _ in range(2):
+            with pytest.raises(DivisionByZeroError):
+                calculate("5 / 0")
+
+    def test_syntax_errors_before_evaluation(self, monkeypatch):
+        """Тест: ошибки синтаксиса сообщаются до вычислений."""
+        with pytest.raises(InvalidExpressionError, match="Некорректный символ"):
+            calculate("1/0+abc")
+        with pytest.raises(InvalidExpressionError, match="Несогласованные скобки"):
+            calculate("1/0 + )")
+
+        def fail(*args):
+            raise AssertionError("вычисление до проверки синтаксиса")
+
+        monkeypatch.setattr(calc, "_parse_expr", fail)
+        monkeypatch.setattr(calc, "evaluate_rpn", fail)
+        with pytest.raises(InvalidExpressionError, match="Некорректный символ"):
+            calculate("9**9**7 + $")
+        with pytest.raises(InvalidExpressionError, match="Недостаточно операндов"):
+            calculate("9**9**7 +")
+
+        with pytest.raises(InvalidExpressionError, match="Недостаточно операндов"):
+            tokenize("2 + * 3")
+        with pytest.raises(InvalidExpressionError, match="Недостаточно операндов"):
+            tokenize("(2 +)")
+        with pytest.raises(InvalidExpressionError, match="Некорректное выражение"):
+            tokenize("(1)(2)")
+
+    def test_deep_nesting(self):
+        """Тест глубокой вложенности скобок и цепочек унарных знаков."""
+        assert calculate("(" * 1000 + "1" + ")" * 1000) == 1
+        assert calculate("-" * 1000 + "1") == 1
+        assert calculate("-" * 1001 + "1") == -1
+        assert calculate("-(" * 1000 + "2" + ")" * 1000) == 2
+        assert calculate("1 + (" * 1000 + "1" + ")" * 1000) == 1001
+        assert calculate("1 ** " * 1000 + "1") == 1
+
+        depth = 200001
+        assert calculate("(" * depth + "1" + ")" * depth) == 1
+        assert calculate("-" * depth + "1") == -1
+
     def test_edge_cases(self):
         """Тест граничных случаев."""
         assert calculate("0") == 0
@@ -224,6 +366,29 @@ class TestIntegration:
         assert calculate("10 + 20 * 30") == 610
         assert calculate("2 * 3 + 4 * 5") == 26
 
+    def test_streaming_matches_rpn(self):
+        """Тест совпадения разбора Пратта с конвейером RPN."""
+        expressions = [
+            "2 + 3 * (4 - 1)",
+            "-(2 + 3) ** 2",
+            "2 ** -1",
+            "10 // 3 - 10 % 3 * 2",
+            "((1.5 + 2) * -(3 - 4)) / 7",
+            "--5 + +-3",
+            "2 ** -2 ** 2",
+            "-2 ** 2",
+        ]
+
+        for expr in expressions:
+            assert calculate(expr) == evaluate_rpn(to_rpn(tokenize(expr)))
+
+        with pytest.raises(InvalidExpressionError):
+            calculate("()")
+        with pytest.raises(InvalidExpressionError):
+            calculate("(1 2)")
+        with pytest.raises(InvalidExpressionError):
+            calculate("(1 +)")
+
     def test_expression_chain(self):
         """Тест цепочки выражений."""
         expressions = [